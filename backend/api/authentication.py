@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.metrics import record_cache
+
+User = get_user_model()
+
+TOKEN_GENERATION_KEY = 'token_generation:{user_id}'
+
+
+def get_token_generation(user_id):
+    key = TOKEN_GENERATION_KEY.format(user_id=user_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = uuid4().hex
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def revoke_tokens(user_id):
+    cache.delete(TOKEN_GENERATION_KEY.format(user_id=user_id))
+    token_cache.invalidate_user(user_id)
+
+
+def get_token_cache_timeout():
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache)):
+        return min(
+            settings.TOKEN_CACHE_TIMEOUT, settings.TOKEN_CACHE_LOCAL_TIMEOUT
+        )
+    return settings.TOKEN_CACHE_TIMEOUT
+
+
+class TokenCache:
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.lock = Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+        if (
+            entry is None
+            or entry[0] < monotonic()
+            or get_token_generation(entry[1]) != entry[2]
+        ):
+            with self.lock:
+                self.entries.pop(key, None)
+                self.misses += 1
+            record_cache('token', False)
+            return None
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+            self.hits += 1
+        record_cache('token', True)
+        return entry[3]
+
+    def set(self, key, token):
+        user = token.user
+        value = (
+            token.created,
+            tuple(
+                getattr(user, field.attname)
+                for field in User._meta.concrete_fields
+            )
+        )
+        generation = get_token_generation(user.pk)
+        with self.lock:
+            self.entries[key] = (
+                monotonic() + self.timeout, user.pk, generation, value
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        with self.lock:
+            for key in [
+                key for key, entry in self.entries.items()
+                if entry[1] == user_id
+            ]:
+                del self.entries[key]
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+            }
+
+
+token_cache = TokenCache(
+    settings.TOKEN_CACHE_SIZE, get_token_cache_timeout()
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+            return user, token
+        created, values = entry
+        user = User.from_db(
+            router.db_for_read(User),
+            [field.attname for field in User._meta.concrete_fields],
+            values
+        )
+        token = Token.from_db(
+            router.db_for_read(Token),
+            ['key', 'user_id', 'created'],
+            (key, user.pk, created)
+        )
+        token.user = user
+        return user, token
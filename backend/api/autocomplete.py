@@ -0,0 +1,113 @@
+from array import array
+from bisect import bisect_left
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+
+from api.cache import get_catalog_version
+from recipes.models import Ingredients
+
+
+def prefix_matches(names, query, limit):
+    matches = []
+    position = bisect_left(names, query)
+    while (
+        len(matches) < limit
+        and position < len(names)
+        and names[position].startswith(query)
+    ):
+        matches.append(position)
+        position += 1
+    return matches
+
+
+def suffixes_start(names, suffixes, query):
+    positions, offsets = suffixes
+    low, high = 0, len(positions)
+    while low < high:
+        middle = (low + high) // 2
+        offset = offsets[middle]
+        if names[positions[middle]][offset:offset + len(query)] < query:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def contains_matches(names, suffixes, query, exclude, limit):
+    positions, offsets = suffixes
+    matches = set()
+    index = suffixes_start(names, suffixes, query)
+    while len(matches) < limit and index < len(positions):
+        position = positions[index]
+        if not names[position].startswith(query, offsets[index]):
+            break
+        if position not in exclude:
+            matches.add(position)
+        index += 1
+    return sorted(matches)
+
+
+class IngredientsIndex:
+
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.index = ([], [], (array('l'), array('H')))
+
+    def build(self):
+        ingredients = sorted(
+            Ingredients.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda ingredient: (
+                ingredient['name'].lower(), ingredient['measurement_unit']
+            )
+        )
+        names = [ingredient['name'].lower() for ingredient in ingredients]
+        suffixes = sorted(
+            (
+                (position, offset)
+                for position, name in enumerate(names)
+                for offset in range(1, len(name))
+            ),
+            key=lambda suffix: (names[suffix[0]][suffix[1]:], suffix[0])
+        )
+        return ingredients, names, (
+            array('l', (position for position, _ in suffixes)),
+            array('H', (offset for _, offset in suffixes))
+        )
+
+    def get_index(self):
+        version, _ = get_catalog_version(Ingredients)
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.index = self.build()
+                    self.version = version
+        return self.index
+
+    def similar(self, query, limit):
+        return list(
+            Ingredients.objects.filter(name__trigram_similar=query).annotate(
+                similarity=TrigramSimilarity('name', query)
+            ).order_by('-similarity', 'name').values(
+                'id', 'name', 'measurement_unit'
+            )[:limit]
+        )
+
+    def search(self, query, limit=None):
+        limit = limit or settings.INGREDIENTS_AUTOCOMPLETE_LIMIT
+        query = query.strip().lower()
+        if not query:
+            return []
+        ingredients, names, suffixes = self.get_index()
+        matches = prefix_matches(names, query, limit)
+        matches += contains_matches(
+            names, suffixes, query, set(matches), limit - len(matches)
+        )
+        if not matches:
+            return self.similar(query, limit)
+        return [ingredients[position] for position in matches]
+
+
+ingredients_index = IngredientsIndex()
@@ -0,0 +1,274 @@
+import json
+import random
+from itertools import combinations
+from statistics import mean, quantiles
+from time import perf_counter
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.cache import invalidate_catalog
+from api.cookable import record_changes
+from recipes.counters import recount
+from recipes.feed import backfill
+from recipes.models import (Ingredients, IngredientsAmount, Recipes,
+                            RecipesIsFavorited, RecipesIsInShoppingCart,
+                            Subscriptions, Tags)
+from recipes.search import update_search_vector
+
+User = get_user_model()
+
+PREFIX = 'bench'
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+FILTERS = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
+
+
+def seed(users, recipes, relations, ingredients_path, batch_size=1000):
+    rng = random.Random(users * recipes + relations)
+    with open(ingredients_path, encoding='utf-8') as file:
+        Ingredients.objects.bulk_create(
+            [Ingredients(**ingredient) for ingredient in json.load(file)],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+    Tags.objects.bulk_create(
+        [
+            Tags(name=f'{PREFIX} {n}', slug=f'{PREFIX}-{n}', color='#FF0000')
+            for n in range(5)
+        ],
+        ignore_conflicts=True
+    )
+    ingredients = list(Ingredients.objects.values_list('id', 'name'))
+    tags = list(Tags.objects.filter(slug__startswith=PREFIX).values_list(
+        'id', flat=True
+    ))
+    offset = User.objects.filter(username__startswith=PREFIX).count()
+    password = make_password(None)
+    authors = User.objects.bulk_create(
+        [
+            User(
+                username=f'{PREFIX}{n}',
+                email=f'{PREFIX}{n}@example.com',
+                first_name='Bench',
+                last_name=str(n),
+                password=password
+            )
+            for n in range(offset, offset + users)
+        ],
+        batch_size=batch_size
+    )
+    created = Recipes.objects.bulk_create(
+        [
+            Recipes(
+                author=rng.choice(authors),
+                name=f'{PREFIX} {offset}-{n}',
+                text=' '.join(
+                    name for _, name in rng.sample(ingredients, 5)
+                ),
+                image='recipes/images/bench.png',
+                cooking_time=rng.randint(5, 180)
+            )
+            for n in range(recipes)
+        ],
+        batch_size=batch_size
+    )
+    IngredientsAmount.objects.bulk_create(
+        [
+            IngredientsAmount(
+                recipe=recipe, ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500)
+            )
+            for recipe in created
+            for ingredient_id, _ in rng.sample(
+                ingredients, rng.randint(3, 10)
+            )
+        ],
+        batch_size=batch_size
+    )
+    Recipes.tags.through.objects.bulk_create(
+        [
+            Recipes.tags.through(recipes_id=recipe.id, tags_id=tag_id)
+            for recipe in created
+            for tag_id in rng.sample(tags, rng.randint(1, 3))
+        ],
+        batch_size=batch_size
+    )
+    for model in (RecipesIsFavorited, RecipesIsInShoppingCart):
+        model.objects.bulk_create(
+            [
+                model(user=user, recipe=recipe)
+                for user in authors
+                for recipe in rng.sample(created, min(relations, recipes))
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+    subscriptions = {
+        user.id: [
+            following.id
+            for following in rng.sample(authors, min(relations, users))
+            if following != user
+        ]
+        for user in authors
+    }
+    Subscriptions.objects.bulk_create(
+        [
+            Subscriptions(user_id=user_id, following_id=following_id)
+            for user_id, following in subscriptions.items()
+            for following_id in following
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True
+    )
+    recount()
+    for user_id, following in subscriptions.items():
+        backfill(user_id, following)
+    update_search_vector(Recipes.objects.filter(
+        id__in=[recipe.id for recipe in created]
+    ))
+    record_changes(*(recipe.id for recipe in created))
+    for model in (Tags, Ingredients):
+        invalidate_catalog(model)
+    return len(authors), len(created)
+
+
+def get_scenarios(user):
+    rng = random.Random(user.id)
+    recipe = Recipes.objects.filter(author=user).first()
+    tag = Tags.objects.filter(slug__startswith=PREFIX).first()
+    ingredients = list(Ingredients.objects.values_list('id', 'name')[:1000])
+    amounts = [
+        {'id': ingredient_id, 'amount': 10}
+        for ingredient_id, _ in rng.sample(ingredients, 5)
+    ]
+    params = {
+        'is_favorited': '1',
+        'is_in_shopping_cart': '1',
+        'author': recipe.author_id if recipe else user.id,
+        'tags': tag.slug,
+    }
+    word = rng.choice(ingredients)[1].split()[0]
+    scenarios = {}
+    for size in range(len(FILTERS) + 1):
+        for names in combinations(FILTERS, size):
+            query = '&'.join(f'{name}={params[name]}' for name in names)
+            scenarios[f'recipes?{"&".join(names)}'] = (
+                'get', f'/api/recipes/?{query}', None
+            )
+    scenarios['recipes?search'] = ('get', f'/api/recipes/?search={word}', None)
+    scenarios['recipes icontains'] = lambda: list(
+        Recipes.objects.filter(
+            Q(name__icontains=word)
+            | Q(text__icontains=word)
+            | Q(ingredients__name__icontains=word)
+        ).distinct().order_by('-pub_date', '-id')[:6]
+    )
+    scenarios['ingredients?name'] = (
+        'get', f'/api/ingredients/?name={word[:3]}', None
+    )
+    scenarios['users/subscriptions'] = (
+        'get', '/api/users/subscriptions/?recipes_limit=3', None
+    )
+    scenarios['recipes/feed'] = ('get', '/api/recipes/feed/', None)
+    scenarios['download_shopping_cart'] = (
+        'get', '/api/recipes/download_shopping_cart/', None
+    )
+    scenarios['recipes create'] = ('post', '/api/recipes/', lambda: {
+        'name': f'{PREFIX} {uuid4().hex}',
+        'text': word,
+        'cooking_time': 10,
+        'image': IMAGE,
+        'tags': [tag.id],
+        'ingredients': amounts,
+    })
+    if recipe is not None:
+        tags = list(recipe.tags.values_list('id', flat=True))
+        scenarios['recipes update'] = (
+            'patch', f'/api/recipes/{recipe.id}/', lambda: {
+                'name': recipe.name,
+                'text': f'{word} {rng.random()}',
+                'cooking_time': 10,
+                'image': IMAGE,
+                'tags': tags,
+                'ingredients': rng.sample(amounts, rng.randint(1, 5)),
+            }
+        )
+    return scenarios
+
+
+def percentile(durations, n):
+    if len(durations) < 2:
+        return durations[0]
+    return quantiles(durations, n=100, method='inclusive')[n - 1]
+
+
+def measure(client, scenario, requests):
+    durations = []
+    queries = []
+    errors = 0
+    for _ in range(requests):
+        if not callable(scenario):
+            method, url, data = scenario
+            if callable(data):
+                data = data()
+        with CaptureQueriesContext(connection) as context:
+            start = perf_counter()
+            if callable(scenario):
+                scenario()
+            else:
+                response = getattr(client, method)(url, data, format='json')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                errors += response.status_code >= 400
+            durations.append((perf_counter() - start) * 1000)
+        queries.append(len(context))
+    return {
+        'p50': percentile(durations, 50),
+        'p95': percentile(durations, 95),
+        'p99': percentile(durations, 99),
+        'rps': len(durations) / sum(durations) * 1000,
+        'queries': mean(queries),
+        'errors': errors,
+    }
+
+
+def run(requests, scenarios=None):
+    user = User.objects.filter(username__startswith=PREFIX).order_by(
+        '-recipes_count', 'id'
+    ).first()
+    if user is None:
+        return None
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    results = {}
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        for name, scenario in get_scenarios(user).items():
+            if scenarios and name not in scenarios:
+                continue
+            measure(client, scenario, 1)
+            results[name] = measure(client, scenario, requests)
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = {}
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        if (
+            stats['p95'] > base['p95'] * (1 + threshold)
+            or stats['queries'] > base['queries']
+        ):
+            regressions[name] = base
+    return regressions
@@ -0,0 +1,113 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from api.metrics import record_cache
+from recipes.models import RecipesIsInShoppingCart, Tags, Watermarks
+
+SHOPPING_CART_KEY = 'shopping_cart:{user_id}:{version}'
+CATALOG_VERSION_KEY = 'catalog_version:{model}'
+CATALOG_KEY = 'catalog:{model}:{version}:{format}:{path}'
+CATALOG_WATERMARK = 'catalog:{model}'
+SHOPPING_CART_WATERMARK = 'shopping_cart:{user_id}'
+
+tags_ids = {'version': None, 'ids': {}}
+
+
+def get_shopping_cart_version(user_id):
+    return Watermarks.objects.filter(
+        name=SHOPPING_CART_WATERMARK.format(user_id=user_id)
+    ).values_list('value', flat=True).first() or 0
+
+
+def invalidate_shopping_cart(*user_ids):
+    if not user_ids:
+        return
+    connection = connections[router.db_for_write(Watermarks)]
+    quote = connection.ops.quote_name
+    table = quote(Watermarks._meta.db_table)
+    name = quote(Watermarks._meta.get_field('name').column)
+    value = quote(Watermarks._meta.get_field('value').column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({name}, {value}) '
+            'SELECT UNNEST(%(names)s), %(now)s '
+            f'ON CONFLICT ({name}) DO UPDATE SET {value} = '
+            f'GREATEST({table}.{value} + 1, EXCLUDED.{value})',
+            {
+                'names': sorted({
+                    SHOPPING_CART_WATERMARK.format(user_id=user_id)
+                    for user_id in user_ids
+                }),
+                'now': int(time.time() * 1000),
+            }
+        )
+
+
+def invalidate_recipe_in_shopping_carts(recipe_id):
+    users = RecipesIsInShoppingCart.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('user_id', flat=True)
+    invalidate_shopping_cart(*users)
+
+
+def cached_shopping_cart(user_id, version, ingredients):
+    key = SHOPPING_CART_KEY.format(user_id=user_id, version=version)
+    rows = cache.get(key)
+    record_cache('shopping_cart', rows is not None)
+    if rows is not None:
+        yield from rows
+        return
+    rows = []
+    for row in ingredients:
+        rows.append(row)
+        yield row
+    cache.set(key, rows, settings.SHOPPING_CART_CACHE_TIMEOUT)
+
+
+def get_catalog_version(model):
+    label = model._meta.label_lower
+    key = CATALOG_VERSION_KEY.format(model=label)
+    version = cache.get(key)
+    if version is None:
+        watermark, _ = Watermarks.objects.get_or_create(
+            name=CATALOG_WATERMARK.format(model=label),
+            defaults={'value': int(time.time() * 1000)}
+        )
+        version = (watermark.value, watermark.value // 1000)
+        cache.set(key, version, settings.CATALOG_VERSION_TIMEOUT)
+    return version
+
+
+def invalidate_catalog(model):
+    label = model._meta.label_lower
+    name = CATALOG_WATERMARK.format(model=label)
+    now = int(time.time() * 1000)
+    if not Watermarks.objects.filter(name=name).update(
+        value=Greatest(F('value') + 1, Value(now))
+    ):
+        Watermarks.objects.get_or_create(name=name, defaults={'value': now})
+    transaction.on_commit(
+        lambda: cache.delete(CATALOG_VERSION_KEY.format(model=label))
+    )
+
+
+def get_catalog_key(model, version, format, path):
+    return CATALOG_KEY.format(
+        model=model._meta.label_lower,
+        version=version,
+        format=format,
+        path=path
+    )
+
+
+def get_tags_ids():
+    version, _ = get_catalog_version(Tags)
+    if tags_ids['version'] != version:
+        tags_ids['ids'] = dict(Tags.objects.values_list('slug', 'id'))
+        tags_ids['version'] = version
+    return tags_ids['ids']
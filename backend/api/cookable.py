@@ -0,0 +1,135 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+from recipes.models import IngredientsAmount, IngredientsChanges
+
+COOKABLE_VERSION_KEY = 'cookable_version'
+
+
+def record_changes(*recipe_ids):
+    if not recipe_ids:
+        return
+    connection = connections[router.db_for_write(IngredientsChanges)]
+    table = connection.ops.quote_name(IngredientsChanges._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH inserted AS (INSERT INTO {table} (recipe_id) '
+            'SELECT UNNEST(%(recipes)s) RETURNING id) '
+            f'DELETE FROM {table} '
+            'WHERE id <= (SELECT MAX(id) FROM inserted) - %(keep)s',
+            {
+                'recipes': list(recipe_ids),
+                'keep': settings.COOKABLE_CHANGES_KEEP,
+            }
+        )
+    transaction.on_commit(
+        lambda: cache.delete(COOKABLE_VERSION_KEY), using=connection.alias
+    )
+
+
+def fetch_last_change():
+    return IngredientsChanges.objects.aggregate(
+        last_change=Max('id')
+    )['last_change'] or 0
+
+
+def get_last_change():
+    last_change = cache.get(COOKABLE_VERSION_KEY)
+    if last_change is None:
+        last_change = fetch_last_change()
+        cache.set(
+            COOKABLE_VERSION_KEY, last_change,
+            settings.CATALOG_VERSION_TIMEOUT
+        )
+    return last_change
+
+
+class CookableIndex:
+
+    def __init__(self):
+        self.lock = Lock()
+        self.last_change = None
+        self.postings = {}
+        self.recipes = {}
+
+    def build(self):
+        self.last_change = fetch_last_change()
+        postings = defaultdict(lambda: array('q'))
+        recipes = defaultdict(list)
+        for ingredient_id, recipe_id in IngredientsAmount.objects.order_by(
+            'recipe_id'
+        ).values_list('ingredient_id', 'recipe_id').iterator():
+            postings[ingredient_id].append(recipe_id)
+            recipes[recipe_id].append(ingredient_id)
+        self.postings = dict(postings)
+        self.recipes = {
+            recipe_id: frozenset(ingredients)
+            for recipe_id, ingredients in recipes.items()
+        }
+
+    def apply(self, recipe_id, ingredients):
+        previous = self.recipes.pop(recipe_id, frozenset())
+        for ingredient_id in previous - ingredients:
+            posting = self.postings[ingredient_id]
+            del posting[bisect_left(posting, recipe_id)]
+            if not posting:
+                del self.postings[ingredient_id]
+        for ingredient_id in ingredients - previous:
+            insort(
+                self.postings.setdefault(ingredient_id, array('q')),
+                recipe_id
+            )
+        if ingredients:
+            self.recipes[recipe_id] = ingredients
+
+    def update(self):
+        changes = list(IngredientsChanges.objects.filter(
+            id__gt=self.last_change - settings.COOKABLE_CHANGES_LOOKBACK
+        ).values_list('id', 'recipe_id'))
+        recipe_ids = {recipe_id for _, recipe_id in changes}
+        ingredients = defaultdict(set)
+        for recipe_id, ingredient_id in IngredientsAmount.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            ingredients[recipe_id].add(ingredient_id)
+        for recipe_id in recipe_ids:
+            self.apply(recipe_id, frozenset(ingredients[recipe_id]))
+        self.last_change = max(
+            (change_id for change_id, _ in changes), default=self.last_change
+        )
+
+    def refresh(self):
+        last_change = get_last_change()
+        if self.last_change is not None and last_change <= self.last_change:
+            return
+        with self.lock:
+            if self.last_change is None or (
+                last_change - self.last_change
+                > settings.COOKABLE_CHANGES_KEEP
+                - settings.COOKABLE_CHANGES_LOOKBACK
+            ):
+                self.build()
+            elif last_change > self.last_change:
+                self.update()
+
+    def search(self, ingredient_ids):
+        self.refresh()
+        matched = Counter()
+        with self.lock:
+            for ingredient_id in set(ingredient_ids):
+                matched.update(self.postings.get(ingredient_id, ()))
+            missing = [
+                (recipe_id, len(self.recipes[recipe_id]) - matches)
+                for recipe_id, matches in matched.items()
+            ]
+        return sorted(missing, key=lambda recipe: (recipe[1], -recipe[0]))
+
+
+cookable_index = CookableIndex()
@@ -1,6 +1,11 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Exists, F, OuterRef
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
 
-from recipes.models import Ingredients, Recipes, Tags
+from api.cache import get_tags_ids
+from recipes.models import Ingredients, Recipes
 
 
 class IngredientsFilter(filters.FilterSet):
@@ -27,18 +32,59 @@ class RecipesFilter(filters.FilterSet):
         field_name='author__id',
         lookup_expr='exact'
     )
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tags.objects.all()
+    tags = filters.MultipleChoiceFilter(
+        choices=lambda: [(slug, slug) for slug in get_tags_ids()],
+        method='filter_tags'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipes
-        fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
+        fields = (
+            'is_favorited', 'is_in_shopping_cart', 'author', 'tags', 'search'
+        )
 
     def filter_favorited_cart(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             lookup = '__'.join([name, 'user'])
             return queryset.filter(**{lookup: self.request.user})
         return queryset
+
+    def filter_tags(self, queryset, name, value):
+        tags_ids = get_tags_ids()
+        ids = [tags_ids[slug] for slug in value if slug in tags_ids]
+        return queryset.filter(Exists(Recipes.tags.through.objects.filter(
+            recipes_id=OuterRef('pk'), tags_id__in=ids
+        )))
+
+    def filter_search(self, queryset, name, value):
+        query = SearchQuery(
+            value, config=settings.SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        )
+
+
+class RecipesOrderingFilter(OrderingFilter):
+    popular = 'popular'
+
+    def filter_queryset(self, request, queryset, view):
+        if request.query_params.get(self.ordering_param) == self.popular:
+            queryset = queryset.filter(popularity__isnull=False).annotate(
+                popular_score=F('popularity__score')
+            )
+        return super().filter_queryset(request, queryset, view)
+
+    def get_ordering(self, request, queryset, view):
+        if 'popular_score' in queryset.query.annotations:
+            return ('-popular_score', '-id')
+        if (
+            'rank' in queryset.query.annotations
+            and not request.query_params.get(self.ordering_param)
+        ):
+            return ('-rank', '-id')
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if '-id' not in ordering and 'id' not in ordering:
+            ordering += ('-id',)
+        return ordering
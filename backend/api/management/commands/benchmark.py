@@ -0,0 +1,115 @@
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from api.benchmark import PREFIX, compare, run, seed
+from recipes.images import executor
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Замеряет задержку и число запросов к БД для основных эндпоинтов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Добавить синтетические данные к уже сохраненным'
+        )
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--relations', type=int, default=20,
+            help='Избранное, покупки и подписки на пользователя'
+        )
+        parser.add_argument(
+            '--ingredients', default=settings.BASE_DIR / 'ingredients.json'
+        )
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу после замеров'
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Запустить только указанные сценарии'
+        )
+        parser.add_argument('--save', help='Сохранить результаты в JSON')
+        parser.add_argument(
+            '--compare', help='Сравнить с сохраненными результатами'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95 относительно сохраненных результатов'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должен быть не меньше 1')
+        media_root = tempfile.mkdtemp()
+        caches = {
+            alias: {**cache, 'KEY_PREFIX': 'benchmark'}
+            for alias, cache in settings.CACHES.items()
+        }
+        try:
+            with override_settings(MEDIA_ROOT=media_root, CACHES=caches):
+                old_name = connection.creation.create_test_db(
+                    verbosity=0, autoclobber=True, serialize=False,
+                    keepdb=options['keepdb']
+                )
+                try:
+                    self.benchmark(options)
+                finally:
+                    executor.shutdown()
+                    connection.creation.destroy_test_db(
+                        old_name, verbosity=0, keepdb=options['keepdb']
+                    )
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def benchmark(self, options):
+        if options['seed'] or not User.objects.filter(
+            username__startswith=PREFIX
+        ).exists():
+            users, recipes = seed(
+                options['users'], options['recipes'], options['relations'],
+                options['ingredients']
+            )
+            self.stdout.write(
+                f'Добавлено пользователей: {users}, рецептов: {recipes}'
+            )
+        results = run(options['requests'], options['scenarios'])
+        if results is None:
+            raise CommandError('Нет данных, запустите команду с --seed')
+        self.stdout.write(
+            f'{"сценарий":<56}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"rps":>9}{"запросы":>9}{"ошибки":>8}'
+        )
+        for name, stats in results.items():
+            self.stdout.write(
+                f'{name:<56}{stats["p50"]:>9.1f}{stats["p95"]:>9.1f}'
+                f'{stats["p99"]:>9.1f}{stats["rps"]:>9.1f}'
+                f'{stats["queries"]:>9.1f}{stats["errors"]:>8}'
+            )
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            regressions = compare(results, baseline, options['threshold'])
+            for name, base in regressions.items():
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: p95 {base["p95"]:.1f} -> '
+                    f'{results[name]["p95"]:.1f} мс, запросы '
+                    f'{base["queries"]:.1f} -> {results[name]["queries"]:.1f}'
+                ))
+            if regressions:
+                raise CommandError(f'Регрессий: {len(regressions)}')
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
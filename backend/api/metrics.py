@@ -0,0 +1,84 @@
+import os
+from functools import lru_cache
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+REQUESTS = Counter(
+    'foodgram_http_requests_total',
+    'Количество запросов к API',
+    ('view', 'action', 'method', 'status')
+)
+LATENCY = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки запроса',
+    ('view', 'action')
+)
+DB_QUERIES = Counter(
+    'foodgram_db_queries_total',
+    'Количество SQL-запросов',
+    ('view', 'action')
+)
+DB_DURATION = Counter(
+    'foodgram_db_query_duration_seconds_total',
+    'Суммарное время SQL-запросов',
+    ('view', 'action')
+)
+CACHE = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кешам',
+    ('cache', 'result')
+)
+
+
+@lru_cache(maxsize=None)
+def get_in_progress():
+    return Gauge(
+        'foodgram_http_requests_in_progress',
+        'Запросы в обработке',
+        multiprocess_mode='livesum'
+    )
+
+
+@lru_cache(maxsize=None)
+def get_workers():
+    return Gauge(
+        'foodgram_gunicorn_workers',
+        'Живые воркеры gunicorn',
+        multiprocess_mode='livesum'
+    )
+
+
+@lru_cache(maxsize=None)
+def get_worker_exits():
+    return Counter(
+        'foodgram_gunicorn_worker_exits_total',
+        'Завершения воркеров gunicorn'
+    )
+
+
+def record_cache(cache, hit):
+    CACHE.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def get_view_labels(request):
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched', ''
+    view = getattr(match.func, 'cls', None)
+    if view is None:
+        return match.view_name or match._func_path, ''
+    actions = getattr(match.func, 'actions', None) or {}
+    return view.__name__, actions.get(request.method.lower(), '')
+
+
+def metrics_view(request):
+    registry = REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,147 @@
+import json
+import logging
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+
+from api.metrics import (DB_DURATION, DB_QUERIES, LATENCY, REQUESTS,
+                         get_in_progress, get_view_labels)
+
+logger = logging.getLogger('api.instrumentation')
+
+metrics = ContextVar('metrics', default=None)
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = []
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((perf_counter() - start, sql))
+
+    def serialize(self, data):
+        self.serializer_depth += 1
+        start = perf_counter()
+        try:
+            return data()
+        finally:
+            self.serializer_depth -= 1
+            if not self.serializer_depth:
+                self.serializer_time += perf_counter() - start
+
+
+def timed_data(serializer_class):
+    data = serializer_class.data
+    if getattr(data.fget, 'timed', False):
+        return
+
+    def timed(self):
+        current = metrics.get()
+        if current is None:
+            return data.fget(self)
+        return current.serialize(lambda: data.fget(self))
+
+    timed.timed = True
+    serializer_class.data = property(timed)
+
+
+class InstrumentationMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        timed_data(serializers.Serializer)
+        timed_data(serializers.ListSerializer)
+
+    def __call__(self, request):
+        current = RequestMetrics()
+        token = metrics.set(current)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(current.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.reset(token)
+        total = perf_counter() - start
+        db_time = sum(duration for duration, _ in current.queries)
+        match = request.resolver_match
+        view = match.view_name if match else None
+        budget = settings.INSTRUMENTATION_QUERY_BUDGETS.get(
+            f'{request.method} {view}', settings.INSTRUMENTATION_QUERY_BUDGET
+        )
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={db_time * 1000:.1f};desc="{len(current.queries)} SQL"',
+            f'serializer;dur={current.serializer_time * 1000:.1f}',
+            f'view;dur={(total - current.serializer_time) * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        logger.log(
+            logging.WARNING if len(current.queries) > budget else logging.INFO,
+            json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 1),
+                'db_ms': round(db_time * 1000, 1),
+                'queries': len(current.queries),
+                'query_budget': budget,
+                'serializer_ms': round(current.serializer_time * 1000, 1),
+                'view_ms': round((total - current.serializer_time) * 1000, 1),
+                'size': (
+                    None if response.streaming else len(response.content)
+                ),
+                'slowest': [
+                    {'ms': round(duration * 1000, 1), 'sql': sql[:300]}
+                    for duration, sql in sorted(
+                        current.queries, reverse=True
+                    )[:settings.INSTRUMENTATION_SLOWEST_QUERIES]
+                ],
+            }, ensure_ascii=False)
+        )
+        return response
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        current = RequestMetrics()
+        start = perf_counter()
+        with get_in_progress().track_inprogress(), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(current.execute)
+                )
+            response = self.get_response(request)
+        view, action = get_view_labels(request)
+        LATENCY.labels(view, action).observe(perf_counter() - start)
+        REQUESTS.labels(
+            view, action, request.method, response.status_code
+        ).inc()
+        DB_QUERIES.labels(view, action).inc(len(current.queries))
+        DB_DURATION.labels(view, action).inc(
+            sum(duration for duration, _ in current.queries)
+        )
+        return response
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                quote_etag)
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from api.cache import get_catalog_key, get_catalog_version
+from api.metrics import record_cache
+
+
+class CatalogCacheMixin:
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        model = self.queryset.model
+        version, last_modified = get_catalog_version(model)
+        format = request.accepted_renderer.format
+        etag = quote_etag(f'{version}.{format}')
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            key = get_catalog_key(
+                model, version, format, request.get_full_path()
+            )
+            data = cache.get(key)
+            record_cache('catalog', data is not None)
+            if data is None:
+                data = handler(request, *args, **kwargs).data
+                cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+            response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(
+            response, public=True, max_age=0, must_revalidate=True
+        )
+        return response
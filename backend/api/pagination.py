@@ -1,5 +1,195 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, Cursor,
+                                       CursorPagination, PageNumberPagination,
+                                       _positive_int, _reverse_ordering)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        return cursor.fetchone()[0][0]['Plan']['Plan Rows']
+
+
+class CustomCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    ordering = '-id'
+    position_separator = '|'
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, 'cursor_ordering'):
+            ordering = tuple(view.cursor_ordering)
+        else:
+            ordering = super().get_ordering(request, queryset, view)
+        if 'id' not in ordering and '-id' not in ordering:
+            ordering += ('-id',)
+        return ordering
+
+    def get_position(self, instance):
+        return self.position_separator.join(
+            str(getattr(instance, field.lstrip('-')))
+            for field in self.ordering
+        )
+
+    def get_keyset_filter(self, ordering, position):
+        values = position.split(self.position_separator)
+        if len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        fields = [field.lstrip('-') for field in ordering]
+        lookups = ['lt' if field[0] == '-' else 'gt' for field in ordering]
+        keyset = Q()
+        for index, field in enumerate(fields):
+            keyset |= Q(
+                **dict(zip(fields[:index], values[:index])),
+                **{f'{field}__{lookups[index]}': values[index]}
+            )
+        return Q(**{f'{fields[0]}__{lookups[0]}e': values[0]}) & keyset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get('count') == 'approximate':
+            self.count = estimate_count(queryset)
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = None if self.cursor is None else self.cursor.position
+        ordering = _reverse_ordering(self.ordering) if reverse else (
+            self.ordering
+        )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    self.get_keyset_filter(ordering, position)
+                )
+            except (ValidationError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+        self.has_next = bool(self.page) and (
+            position is not None if reverse else has_more
+        )
+        self.has_previous = bool(self.page) and (
+            has_more if reverse else position is not None
+        )
+        if self.page:
+            self.next_position = self.get_position(self.page[-1])
+            self.previous_position = self.get_position(self.page[0])
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.next_position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.previous_position)
+        )
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data['count'] = self.count
+        return response
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    cursor_pagination_class = CustomCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if isinstance(queryset, QuerySet) and (
+            self.cursor_pagination_class.cursor_query_param
+            in request.query_params
+        ):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class TimelinePagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    invalid_cursor_message = CursorPagination.invalid_cursor_message
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            pub_date, recipe_id = urlsafe_b64decode(
+                encoded.encode('ascii')
+            ).decode('ascii').split('|')
+            return datetime.fromisoformat(pub_date), int(recipe_id)
+        except (UnicodeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row):
+        pub_date, recipe_id = row
+        return urlsafe_b64encode(
+            f'{pub_date.isoformat()}|{recipe_id}'.encode('ascii')
+        ).decode('ascii')
+
+    def paginate_rows(self, fetch, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        rows = fetch(page_size + 1, self.decode_cursor(request))
+        self.next = None
+        if len(rows) > page_size:
+            self.next = self.encode_cursor(rows[page_size - 1])
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.next is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
@@ -0,0 +1,148 @@
+from django.db import connections, router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+
+relations_changed = Signal()
+
+
+def get_relation_sql(model, field):
+    target_field = model._meta.get_field(field)
+    quote = connections[router.db_for_write(model)].ops.quote_name
+    return (
+        quote(model._meta.db_table),
+        quote(model._meta.get_field('user').column),
+        quote(target_field.column),
+        quote(target_field.related_model._meta.db_table)
+    )
+
+
+def get_relation_instance(model, field, relation_id, user, target):
+    return model(id=relation_id, user=user, **{field: target})
+
+
+def add_relation(model, field, user, target_id, allow_self=True):
+    target_model = model._meta.get_field(field).related_model
+    if not str(target_id).isdigit():
+        return None
+    table, user_column, target_column, target_table = get_relation_sql(
+        model, field
+    )
+    self_condition = '' if allow_self else 'WHERE id <> %(user)s'
+    target = next(iter(target_model.objects.raw(
+        f'WITH target AS (SELECT * FROM {target_table} '
+        f'WHERE id = %(target)s), '
+        f'inserted AS (INSERT INTO {table} ({user_column}, {target_column}) '
+        f'SELECT %(user)s, id FROM target {self_condition} '
+        'ON CONFLICT DO NOTHING RETURNING id) '
+        'SELECT target.*, inserted.id AS relation_id '
+        'FROM target LEFT JOIN inserted ON TRUE',
+        {'target': int(target_id), 'user': user.id}
+    )), None)
+    if target is not None and target.relation_id is not None:
+        post_save.send(
+            sender=model,
+            instance=get_relation_instance(
+                model, field, target.relation_id, user, target
+            ),
+            created=True,
+            update_fields=None,
+            raw=False,
+            using=target._state.db
+        )
+    return target
+
+
+def remove_relation(model, field, user, target_id):
+    target_model = model._meta.get_field(field).related_model
+    if not str(target_id).isdigit():
+        return None
+    table, user_column, target_column, target_table = get_relation_sql(
+        model, field
+    )
+    target = next(iter(target_model.objects.raw(
+        f'WITH target AS (SELECT * FROM {target_table} '
+        f'WHERE id = %(target)s), '
+        f'deleted AS (DELETE FROM {table} USING target '
+        f'WHERE {table}.{user_column} = %(user)s '
+        f'AND {table}.{target_column} = target.id '
+        f'RETURNING {table}.id) '
+        'SELECT target.*, deleted.id AS relation_id '
+        'FROM target LEFT JOIN deleted ON TRUE',
+        {'target': int(target_id), 'user': user.id}
+    )), None)
+    if target is not None and target.relation_id is not None:
+        post_delete.send(
+            sender=model,
+            instance=get_relation_instance(
+                model, field, target.relation_id, user, target
+            ),
+            using=target._state.db
+        )
+    return target
+
+
+def add_relations(model, field, user, target_ids, allow_self=True):
+    table, user_column, target_column, target_table = get_relation_sql(
+        model, field
+    )
+    self_condition = '' if allow_self else 'WHERE id <> %(user)s'
+    with connections[router.db_for_write(model)].cursor() as cursor:
+        cursor.execute(
+            f'WITH target AS (SELECT id FROM {target_table} '
+            f'WHERE id = ANY(%(targets)s)), '
+            f'inserted AS (INSERT INTO {table} ({user_column}, '
+            f'{target_column}) '
+            f'SELECT %(user)s, id FROM target {self_condition} '
+            f'ORDER BY id ON CONFLICT DO NOTHING '
+            f'RETURNING {target_column} AS id) '
+            'SELECT target.id, inserted.id IS NOT NULL '
+            'FROM target LEFT JOIN inserted USING (id)',
+            {'targets': list(target_ids), 'user': user.id}
+        )
+        targets = dict(cursor.fetchall())
+    created = [pk for pk in target_ids if targets.get(pk)]
+    if created:
+        relations_changed.send(
+            sender=model, user=user, target_ids=created, delta=1
+        )
+    results = {}
+    for target_id in target_ids:
+        if target_id not in targets:
+            results[target_id] = 'not_found'
+        elif targets[target_id]:
+            results[target_id] = 'created'
+        elif not allow_self and target_id == user.id:
+            results[target_id] = 'self'
+        else:
+            results[target_id] = 'exists'
+    return results
+
+
+def remove_relations(model, field, user, target_ids):
+    table, user_column, target_column, target_table = get_relation_sql(
+        model, field
+    )
+    with connections[router.db_for_write(model)].cursor() as cursor:
+        cursor.execute(
+            f'WITH target AS (SELECT id FROM {target_table} '
+            f'WHERE id = ANY(%(targets)s)), '
+            f'deleted AS (DELETE FROM {table} USING target '
+            f'WHERE {table}.{user_column} = %(user)s '
+            f'AND {table}.{target_column} = target.id '
+            f'RETURNING {table}.{target_column} AS id) '
+            'SELECT target.id, deleted.id IS NOT NULL '
+            'FROM target LEFT JOIN deleted USING (id)',
+            {'targets': list(target_ids), 'user': user.id}
+        )
+        targets = dict(cursor.fetchall())
+    deleted = [pk for pk in target_ids if targets.get(pk)]
+    if deleted:
+        relations_changed.send(
+            sender=model, user=user, target_ids=deleted, delta=-1
+        )
+    return {
+        pk: 'not_found' if pk not in targets else (
+            'deleted' if targets[pk] else 'missing'
+        )
+        for pk in target_ids
+    }
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+
+from rest_framework import renderers
+
+
+class ShoppingCartTxtRenderer(renderers.BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data)
+
+    def stream(self, ingredients):
+        yield 'Список покупок:\n'
+        for name, total, measurement_unit in ingredients:
+            yield f'{name.capitalize()}: {total} {measurement_unit}\n'
+
+
+class ShoppingCartCsvRenderer(renderers.BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+    header = ('Ингредиент', 'Количество', 'Единица измерения')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = data.items()
+        return ''.join(self.write_rows(data))
+
+    def write_rows(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    def stream(self, ingredients):
+        yield from self.write_rows([self.header])
+        yield from self.write_rows(
+            (name.capitalize(), total, measurement_unit)
+            for name, total, measurement_unit in ingredients
+        )
+
+
+class ShoppingCartJsonRenderer(renderers.JSONRenderer):
+    charset = 'utf-8'
+
+    def stream(self, ingredients):
+        yield '['
+        separator = ''
+        for name, total, measurement_unit in ingredients:
+            yield separator + json.dumps(
+                {
+                    'name': name,
+                    'amount': total,
+                    'measurement_unit': measurement_unit
+                },
+                ensure_ascii=False
+            )
+            separator = ','
+        yield ']'
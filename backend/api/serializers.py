@@ -1,14 +1,23 @@
 import base64
+import binascii
 import re
+from tempfile import SpooledTemporaryFile
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer
+from PIL import Image
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.cache import invalidate_recipe_in_shopping_carts
+from api.cookable import record_changes
 from api.validators import tags_ingredients_validator
 from recipes.models import Ingredients, IngredientsAmount, Recipes, Tags
+from recipes.search import update_search_vector
 
 User = get_user_model()
 
@@ -24,6 +33,8 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         if user.is_authenticated:
             return user.follower.filter(following=obj).exists()
@@ -77,13 +88,57 @@ class IngredientsAmountSerializer(serializers.ModelSerializer):
 
 
 class Base64ImageField(serializers.ImageField):
+
+    def __init__(self, *args, rendition=None, **kwargs):
+        self.rendition = rendition
+        super().__init__(*args, **kwargs)
+
+    def decode(self, imgstr, name):
+        if len(imgstr) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(
+                'Размер изображения не может превышать '
+                f'{settings.RECIPE_IMAGE_MAX_SIZE // 1024 // 1024} МБ'
+            )
+        file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        chunk_size = settings.RECIPE_IMAGE_DECODE_CHUNK_SIZE
+        try:
+            for start in range(0, len(imgstr), chunk_size):
+                file.write(
+                    base64.b64decode(imgstr[start:start + chunk_size])
+                )
+            file.seek(0)
+            with Image.open(file) as image:
+                width, height = image.size
+        except (binascii.Error, OSError, Image.DecompressionBombError):
+            raise serializers.ValidationError(
+                self.error_messages['invalid_image']
+            )
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                'Слишком большое разрешение изображения'
+            )
+        file.seek(0)
+        return File(file, name=name)
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode(imgstr, 'temp.' + ext)
         return super().to_internal_value(data)
 
+    def to_representation(self, value):
+        if value and self.rendition:
+            renditions = value.instance.renditions
+            name = renditions.get(self.rendition)
+            if name and renditions.get('source') == value.name:
+                value = value.field.attr_class(
+                    value.instance, value.field, name
+                )
+        return super().to_representation(value)
+
 
 class RecipeReadSerializer(serializers.ModelSerializer):
     tags = TagsSerializer(many=True, read_only=True)
@@ -92,28 +147,53 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         default=serializers.CurrentUserDefault()
     )
     ingredients = IngredientsAmountSerializer(many=True, source='amounts')
-    image = Base64ImageField()
+    image = Base64ImageField(rendition='card')
+    images = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipes
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
+                  'is_in_shopping_cart', 'name', 'image', 'images', 'text',
                   'cooking_time')
 
+    def get_images(self, obj):
+        images = {}
+        for rendition in settings.RECIPE_IMAGE_RENDITIONS:
+            field = Base64ImageField(rendition=rendition)
+            field.bind(rendition, self)
+            images[rendition] = field.to_representation(obj.image)
+        return images
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         if user.is_authenticated:
             return user.in_favorited.filter(recipe=obj).exists()
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_authenticated:
             return user.in_shopping_cart.filter(recipe=obj).exists()
         return False
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
+
+class CookableRecipeSerializer(RecipeReadSerializer):
+    missing_ingredients = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + ('missing_ingredients',)
+
 
 class RecipesSerializer(RecipeReadSerializer):
     tags = serializers.PrimaryKeyRelatedField(
@@ -153,36 +233,95 @@ class RecipesSerializer(RecipeReadSerializer):
         IngredientsAmount.objects.bulk_create(
             [IngredientsAmount(
                 recipe=recipe,
-                ingredient=Ingredients.objects.get(id=ingredient['id']),
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount']
             ) for ingredient in ingredients]
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('amounts')
         recipe = Recipes.objects.create(**validated_data)
         self.add_tags_ingredients(recipe, tags, ingredients)
+        update_search_vector(Recipes.objects.filter(pk=recipe.pk))
+        record_changes(recipe.pk)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients):
+        amounts = {
+            amount.ingredient_id: amount for amount in recipe.amounts.all()
+        }
+        new_amounts = {
+            int(ingredient['id']): int(ingredient['amount'])
+            for ingredient in ingredients
+        }
+        removed = amounts.keys() - new_amounts.keys()
+        created = []
+        changed = []
+        for ingredient_id, amount in new_amounts.items():
+            if ingredient_id not in amounts:
+                created.append(IngredientsAmount(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                ))
+            elif amounts[ingredient_id].amount != amount:
+                amounts[ingredient_id].amount = amount
+                changed.append(amounts[ingredient_id])
+        if removed:
+            IngredientsAmount.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        if created:
+            IngredientsAmount.objects.bulk_create(created)
+        if changed:
+            IngredientsAmount.objects.bulk_update(changed, ('amount',))
+        return bool(removed or created or changed)
+
+    def is_same_image(self, image, new_image):
+        try:
+            if not image or image.size != new_image.size:
+                return False
+            with image.open('rb'):
+                return image.read() == new_image.read()
+        except OSError:
+            return False
+        finally:
+            new_image.seek(0)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.name = validated_data.get('name', instance.name)
-        instance.image = validated_data.get('image', instance.image)
-        instance.text = validated_data.get('text', instance.image)
-        instance.cooking_time = validated_data.get('cooking_time',
-                                                   instance.cooking_time)
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('amounts')
-        instance.ingredients.clear()
-        self.add_tags_ingredients(instance, tags, ingredients)
-        instance.save()
+        update_fields = []
+        for field in ('name', 'text', 'cooking_time'):
+            value = validated_data.get(field, getattr(instance, field))
+            if value != getattr(instance, field):
+                setattr(instance, field, value)
+                update_fields.append(field)
+        image = validated_data.get('image')
+        if image is not None and not self.is_same_image(instance.image, image):
+            instance.image = image
+            update_fields.append('image')
+        instance.tags.set(validated_data.pop('tags'))
+        if self.update_ingredients(instance, validated_data.pop('amounts')):
+            invalidate_recipe_in_shopping_carts(instance.id)
+            update_search_vector(Recipes.objects.filter(pk=instance.pk))
+            record_changes(instance.pk)
+        instance.save(update_fields=update_fields)
         return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'amounts',
+                queryset=IngredientsAmount.objects.select_related('ingredient')
+            )
+        )
         return RecipeReadSerializer(instance, context=self.context).data
 
 
 class ShortRecipesSerializer(serializers.ModelSerializer):
+    image = Base64ImageField(rendition='thumbnail', read_only=True)
 
     class Meta:
         model = Recipes
@@ -193,7 +332,6 @@ class ShortRecipesSerializer(serializers.ModelSerializer):
 class UserSubscribeSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -221,11 +359,22 @@ class UserSubscribeSerializer(UserSerializer):
         return True
 
     def get_recipes(self, obj):
-        limit = self.context['request'].query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit is not None and len(recipes) > int(limit):
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'recipes_preview'):
+            recipes = obj.recipes_preview
+        else:
+            limit = self.context['request'].query_params.get('recipes_limit')
+            recipes = obj.recipes.all()
+            if limit is not None:
+                recipes = recipes[:int(limit)]
         return ShortRecipesSerializer(recipes, many=True).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+
+class RelationsBatchSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RELATIONS_BATCH_MAX_SIZE
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
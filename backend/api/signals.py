@@ -0,0 +1,181 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import revoke_tokens, token_cache
+from api.cache import (invalidate_catalog, invalidate_recipe_in_shopping_carts,
+                       invalidate_shopping_cart)
+from api.cookable import record_changes
+from api.relations import relations_changed
+from recipes.feed import backfill, fan_out, remove
+from recipes.images import schedule_renditions
+from recipes.models import (Ingredients, IngredientsAmount, Recipes,
+                            RecipesIsFavorited, RecipesIsInShoppingCart,
+                            Subscriptions, Tags)
+from recipes.search import update_search_vector
+
+User = get_user_model()
+
+RELATION_COUNTERS = {
+    RecipesIsFavorited: (Recipes, 'favorites_count'),
+    RecipesIsInShoppingCart: (Recipes, 'shopping_cart_count'),
+    Subscriptions: (User, 'followers_count'),
+}
+
+
+def update_counters(model, pks, field, delta):
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def update_counter(model, pk, field, delta):
+    update_counters(model, (pk,), field, delta)
+
+
+@receiver(relations_changed)
+def relations_counters_changed(sender, target_ids, delta, **kwargs):
+    model, field = RELATION_COUNTERS[sender]
+    update_counters(model, target_ids, field, delta)
+
+
+@receiver(post_save, sender=RecipesIsFavorited)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(Recipes, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=RecipesIsFavorited)
+def favorite_deleted(sender, instance, **kwargs):
+    update_counter(Recipes, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=RecipesIsInShoppingCart)
+def shopping_cart_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(Recipes, instance.recipe_id, 'shopping_cart_count', 1)
+
+
+@receiver(post_delete, sender=RecipesIsInShoppingCart)
+def shopping_cart_deleted(sender, instance, **kwargs):
+    update_counter(Recipes, instance.recipe_id, 'shopping_cart_count', -1)
+
+
+@receiver(post_save, sender=Subscriptions)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(User, instance.following_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Subscriptions)
+def subscription_deleted(sender, instance, **kwargs):
+    update_counter(User, instance.following_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Recipes)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipes)
+def recipe_deleted(sender, instance, **kwargs):
+    update_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=RecipesIsInShoppingCart)
+@receiver(post_delete, sender=RecipesIsInShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    invalidate_shopping_cart(instance.user_id)
+
+
+@receiver(relations_changed, sender=RecipesIsInShoppingCart)
+def shopping_cart_batch_changed(sender, user, **kwargs):
+    invalidate_shopping_cart(user.id)
+
+
+@receiver(post_save, sender=IngredientsAmount)
+@receiver(post_delete, sender=IngredientsAmount)
+def ingredients_amount_changed(sender, instance, **kwargs):
+    invalidate_recipe_in_shopping_carts(instance.recipe_id)
+    record_changes(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipes)
+def recipe_changed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_recipe_in_shopping_carts(instance.id)
+    if (
+        instance.image
+        and instance.renditions.get('source') != instance.image.name
+    ):
+        schedule_renditions(instance)
+
+
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+def catalog_changed(sender, **kwargs):
+    invalidate_catalog(sender)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+    revoke_tokens(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    revoke_tokens(instance.pk)
+
+
+@receiver(post_save, sender=Recipes)
+def recipe_search_changed(sender, instance, update_fields, **kwargs):
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        update_search_vector(Recipes.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=IngredientsAmount)
+@receiver(post_delete, sender=IngredientsAmount)
+def ingredients_amount_search_changed(sender, instance, **kwargs):
+    update_search_vector(Recipes.objects.filter(pk=instance.recipe_id))
+
+
+@receiver(post_save, sender=Ingredients)
+def ingredient_search_changed(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vector(
+            Recipes.objects.filter(amounts__ingredient=instance)
+        )
+
+
+@receiver(post_save, sender=Recipes)
+def recipe_fan_out(sender, instance, created, **kwargs):
+    if created:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Subscriptions)
+def subscription_timeline_created(sender, instance, created, **kwargs):
+    if created:
+        backfill(instance.user_id, [instance.following_id])
+
+
+@receiver(post_delete, sender=Subscriptions)
+def subscription_timeline_deleted(sender, instance, **kwargs):
+    remove(instance.user_id, [instance.following_id])
+
+
+@receiver(relations_changed, sender=Subscriptions)
+def subscriptions_timeline_changed(sender, user, target_ids, delta,
+                                   **kwargs):
+    if delta > 0:
+        backfill(user.id, target_ids)
+    else:
+        remove(user.id, target_ids)
@@ -0,0 +1,402 @@
+import json
+import random
+import shutil
+import tempfile
+from itertools import combinations
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.cache import get_tags_ids
+from recipes.counters import recount
+from recipes.models import (Ingredients, IngredientsAmount, Recipes,
+                            RecipesIsFavorited, RecipesIsInShoppingCart,
+                            Subscriptions, Tags)
+
+User = get_user_model()
+
+PAGE_SIZES = (1, 10, 100)
+INGREDIENTS_COUNTS = (1, 30, 100)
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+MEDIA_ROOT = tempfile.mkdtemp()
+FILTERS = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
+PAGE_QUERY = f'SELECT "{Recipes._meta.db_table}".'
+SCANNED_TABLES = {
+    model._meta.db_table for model in (
+        Recipes, Recipes.tags.through, RecipesIsFavorited,
+        RecipesIsInShoppingCart
+    )
+}
+
+
+def create_users(count, prefix):
+    return User.objects.bulk_create([
+        User(
+            username=f'{prefix}{n}',
+            email=f'{prefix}{n}@example.com',
+            first_name='Имя',
+            last_name='Фамилия'
+        )
+        for n in range(count)
+    ])
+
+
+def create_recipes(authors, tags, ingredients):
+    recipes = Recipes.objects.bulk_create([
+        Recipes(
+            author=author,
+            name=f'Рецепт {n}',
+            text='Описание',
+            image='recipes/images/test.png',
+            cooking_time=10
+        )
+        for n, author in enumerate(authors)
+    ])
+    Recipes.tags.through.objects.bulk_create([
+        Recipes.tags.through(recipes_id=recipe.id, tags_id=tag.id)
+        for recipe in recipes
+        for tag in tags
+    ])
+    IngredientsAmount.objects.bulk_create([
+        IngredientsAmount(recipe=recipe, ingredient=ingredient, amount=1)
+        for recipe in recipes
+        for ingredient in ingredients
+    ])
+    return recipes
+
+
+class RecipesQueriesTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_users(1, 'reader')[0]
+        authors = create_users(max(PAGE_SIZES), 'author')
+        tags = Tags.objects.bulk_create([
+            Tags(name=f'Тег {n}', slug=f'tag-{n}', color='#FF0000')
+            for n in range(3)
+        ])
+        ingredients = Ingredients.objects.bulk_create([
+            Ingredients(name=f'Ингредиент {n}', measurement_unit='г')
+            for n in range(5)
+        ])
+        cls.recipes = create_recipes(authors * 2, tags, ingredients)
+        RecipesIsFavorited.objects.bulk_create([
+            RecipesIsFavorited(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes
+        ])
+        Subscriptions.objects.bulk_create([
+            Subscriptions(user=cls.user, following=author)
+            for author in authors
+        ])
+        recount()
+
+    def setUp(self):
+        cache.clear()
+        get_tags_ids()
+        self.client.force_authenticate(self.user)
+
+    def assert_page_queries(self, url, queries, params=None):
+        for limit in PAGE_SIZES:
+            with self.subTest(url=url, limit=limit):
+                with self.assertNumQueries(queries):
+                    response = self.client.get(
+                        url, {'limit': limit, **(params or {})}
+                    )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_queries(self):
+        self.assert_page_queries('/api/recipes/', 4)
+
+    def test_anonymous_list_queries(self):
+        self.client.force_authenticate(None)
+        self.assert_page_queries('/api/recipes/', 4)
+
+    def test_detail_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/recipes/{self.recipes[0].id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_favorites_queries(self):
+        self.assert_page_queries('/api/recipes/', 4, {'is_favorited': 1})
+
+    def test_subscriptions_queries(self):
+        self.assert_page_queries(
+            '/api/users/subscriptions/', 3, {'recipes_limit': 3}
+        )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeCreateQueriesTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_users(1, 'author')[0]
+        cls.tag = Tags.objects.create(
+            name='Тег', slug='tag', color='#FF0000'
+        )
+        cls.ingredients = Ingredients.objects.bulk_create([
+            Ingredients(name=f'Ингредиент {n}', measurement_unit='г')
+            for n in range(max(INGREDIENTS_COUNTS))
+        ])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_create_queries_do_not_depend_on_ingredients(self):
+        for count in INGREDIENTS_COUNTS:
+            with self.subTest(ingredients=count):
+                with self.assertNumQueries(19):
+                    response = self.client.post('/api/recipes/', {
+                        'name': f'Рецепт {count}',
+                        'text': 'Описание',
+                        'cooking_time': 10,
+                        'image': IMAGE,
+                        'tags': [self.tag.id],
+                        'ingredients': [
+                            {'id': ingredient.id, 'amount': 1}
+                            for ingredient in self.ingredients[:count]
+                        ],
+                    }, format='json')
+                self.assertEqual(
+                    response.status_code, status.HTTP_201_CREATED
+                )
+                self.assertEqual(len(response.data['ingredients']), count)
+
+
+class RecipesCursorTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_users(1, 'author')[0]
+        cls.recipes = create_recipes([cls.author] * 10, (), ())
+        cls.pub_date = cls.recipes[0].pub_date
+        Recipes.objects.update(pub_date=cls.pub_date)
+
+    def walk(self, url, link):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            page = [recipe['id'] for recipe in response.data['results']]
+            ids += page if link == 'next' else page[::-1]
+            url = response.data[link]
+        return ids
+
+    def test_equal_pub_dates(self):
+        ids = sorted((recipe.id for recipe in self.recipes), reverse=True)
+        response = self.client.get('/api/recipes/', {'cursor': '', 'limit': 3})
+        first = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(first, ids[:3])
+        recipe = Recipes.objects.create(
+            author=self.author,
+            name='Новый рецепт',
+            text='Описание',
+            image='recipes/images/test.png',
+            cooking_time=10
+        )
+        Recipes.objects.filter(pk=recipe.pk).update(pub_date=self.pub_date)
+        self.assertEqual(
+            first + self.walk(response.data['next'], 'next'), ids
+        )
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=3', 'next'),
+            [recipe.id] + ids
+        )
+
+    def test_previous_links(self):
+        ids = sorted((recipe.id for recipe in self.recipes), reverse=True)
+        url = '/api/recipes/?cursor=&limit=4'
+        while True:
+            response = self.client.get(url)
+            if response.data['next'] is None:
+                break
+            url = response.data['next']
+        previous = self.walk(response.data['previous'], 'previous')
+        self.assertEqual(
+            previous[::-1] + [
+                recipe['id'] for recipe in response.data['results']
+            ],
+            ids
+        )
+
+
+class RelationCountersTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = create_users(2, 'user')
+        cls.recipes = create_recipes([cls.author] * 2, (), ())
+        for model in (RecipesIsFavorited, RecipesIsInShoppingCart):
+            model.objects.bulk_create([
+                model(user=cls.user, recipe=recipe) for recipe in cls.recipes
+            ])
+        Subscriptions.objects.create(user=cls.user, following=cls.author)
+        Recipes.objects.update(favorites_count=0, shopping_cart_count=0)
+        User.objects.update(followers_count=0)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_delete_does_not_make_counters_negative(self):
+        recipe, batch_recipe = self.recipes
+        for path, field in (
+            ('favorite', 'favorites_count'),
+            ('shopping_cart', 'shopping_cart_count'),
+        ):
+            with self.subTest(path=path):
+                response = self.client.delete(
+                    f'/api/recipes/{recipe.id}/{path}/'
+                )
+                self.assertEqual(
+                    response.status_code, status.HTTP_204_NO_CONTENT
+                )
+                response = self.client.delete(
+                    f'/api/recipes/{path}/batch/',
+                    {'ids': [batch_recipe.id]},
+                    format='json'
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    response.data['results'][0]['status'], 'deleted'
+                )
+                self.assertEqual(
+                    set(Recipes.objects.values_list(field, flat=True)), {0}
+                )
+
+    def test_unsubscribe_does_not_make_counter_negative(self):
+        response = self.client.delete(
+            f'/api/users/{self.author.id}/subscribe/'
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+
+
+def get_plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from get_plan_nodes(child)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN (FORMAT JSON)')
+class RecipesFilterPlansTests(APITestCase):
+    users = 200
+    recipes_per_user = 100
+    relations_per_user = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        users = create_users(cls.users, 'user')
+        cls.user = users[0]
+        cls.tags = Tags.objects.bulk_create([
+            Tags(name=f'Тег {n}', slug=f'tag-{n}', color='#FF0000')
+            for n in range(20)
+        ])
+        recipes = Recipes.objects.bulk_create(
+            [
+                Recipes(
+                    author=author,
+                    name=f'Рецепт {n}',
+                    text='Описание',
+                    image='recipes/images/test.png',
+                    cooking_time=10
+                )
+                for author in users
+                for n in range(cls.recipes_per_user)
+            ],
+            batch_size=5000
+        )
+        Recipes.tags.through.objects.bulk_create(
+            [
+                Recipes.tags.through(
+                    recipes_id=recipe.id,
+                    tags_id=cls.tags[n % len(cls.tags)].id
+                )
+                for n, recipe in enumerate(recipes)
+            ],
+            batch_size=5000
+        )
+        for model in (RecipesIsFavorited, RecipesIsInShoppingCart):
+            model.objects.bulk_create(
+                [
+                    model(user=user, recipe=recipe)
+                    for user in users[1:]
+                    for recipe in rng.sample(
+                        recipes, cls.relations_per_user
+                    )
+                ] + [
+                    model(user=cls.user, recipe=recipe)
+                    for recipe in recipes[
+                        cls.recipes_per_user:cls.recipes_per_user * 2
+                    ]
+                ],
+                batch_size=5000
+            )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.params = {
+            'is_favorited': 1,
+            'is_in_shopping_cart': 1,
+            'author': users[1].id,
+            'tags': cls.tags[0].slug,
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def get_scans(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return [
+            (node['Node Type'], node['Relation Name'])
+            for node in get_plan_nodes(plan[0]['Plan'])
+            if node.get('Relation Name') in SCANNED_TABLES
+        ]
+
+    def test_filters_use_index_scans(self):
+        for size in range(1, len(FILTERS) + 1):
+            for names in combinations(FILTERS, size):
+                with self.subTest(filters=names):
+                    with CaptureQueriesContext(connection) as context:
+                        response = self.client.get('/api/recipes/', {
+                            name: self.params[name] for name in names
+                        })
+                    self.assertEqual(
+                        response.status_code, status.HTTP_200_OK
+                    )
+                    pages = [
+                        query['sql'] for query in context.captured_queries
+                        if query['sql'].startswith(PAGE_QUERY)
+                    ]
+                    self.assertEqual(len(pages), 1)
+                    scans = self.get_scans(pages[0])
+                    self.assertNotIn(
+                        'Seq Scan', {node for node, _ in scans},
+                        (scans, pages[0])
+                    )
+                    self.assertIn(
+                        Recipes._meta.db_table,
+                        {table for node, table in scans if 'Index' in node},
+                        (scans, pages[0])
+                    )
@@ -4,14 +4,16 @@ from django.core.exceptions import ValidationError
 def tags_ingredients_validator(field, Model, value=None):
     if value is None or len(value) == 0:
         raise ValidationError(f'Должен быть хотя бы один {field}')
-    elements = set()
     if field == 'ингредиент':
-        for element in value:
-            if not Model.objects.filter(id=element['id']).exists():
-                raise ValidationError(f'Нет {field}а c id {element["id"]}')
-            elements.add(element['id'])
+        elements = [str(element['id']) for element in value]
+        existing = set(map(str, Model.objects.filter(
+            id__in=elements
+        ).values_list('id', flat=True)))
+        for element in elements:
+            if element not in existing:
+                raise ValidationError(f'Нет {field}а c id {element}')
     else:
-        elements = set(value)
-    if len(value) > len(elements):
+        elements = value
+    if len(value) > len(set(elements)):
         raise ValidationError(f'Введен повторяющийся {field}')
     return value
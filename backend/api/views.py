@@ -1,7 +1,13 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.db import connections
+from django.db.models import Exists, F, OuterRef, Prefetch, Sum, Window
+from django.db.models.functions import RowNumber
+from django.http import Http404, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
@@ -9,37 +15,139 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from api.filters import IngredientsFilter, RecipesFilter
+from api.autocomplete import ingredients_index
+from api.cache import cached_shopping_cart, get_shopping_cart_version
+from api.cookable import cookable_index
+from api.filters import IngredientsFilter, RecipesFilter, RecipesOrderingFilter
+from api.mixins import CatalogCacheMixin
+from api.pagination import TimelinePagination
 from api.permissions import IsStaffAuthorOrReadOnly
-from api.serializers import (IngredientsSerializer, RecipeReadSerializer,
-                             RecipesSerializer, ShortRecipesSerializer,
+from api.relations import (add_relation, add_relations, remove_relation,
+                           remove_relations)
+from api.renderers import (ShoppingCartCsvRenderer, ShoppingCartJsonRenderer,
+                           ShoppingCartTxtRenderer)
+from api.serializers import (CookableRecipeSerializer, IngredientsSerializer,
+                             RecipeReadSerializer, RecipesSerializer,
+                             RelationsBatchSerializer, ShortRecipesSerializer,
                              TagsSerializer, UserSubscribeSerializer)
+from recipes.feed import get_feed
 from recipes.models import (Ingredients, IngredientsAmount, Recipes,
                             RecipesIsFavorited, RecipesIsInShoppingCart,
                             Subscriptions, Tags)
 
 User = get_user_model()
 
+PREVIEW_FIELDS = (
+    'id', 'author', 'name', 'image', 'renditions', 'cooking_time'
+)
+
+
+def shopping_cart_etag(request):
+    version = get_shopping_cart_version(request.user.id)
+    return f'{version}.{request.accepted_renderer.format}'
+
+
+def get_recipes_previews(authors, limit=None):
+    previews = defaultdict(list)
+    if not authors:
+        return previews
+    recipes = Recipes.objects.filter(author__in=authors).only(
+        *PREVIEW_FIELDS
+    ).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('author'),
+            order_by=(F('pub_date').desc(), F('id').desc())
+        )
+    ).order_by()
+    sql, params = recipes.query.sql_with_params()
+    quote = connections[recipes.db].ops.quote_name
+    columns = ', '.join(
+        quote(Recipes._meta.get_field(field).column)
+        for field in PREVIEW_FIELDS
+    )
+    sql = f'SELECT {columns}, row_number FROM ({sql}) AS recipes'
+    if limit is not None:
+        sql += ' WHERE row_number <= %s'
+        params += (int(limit),)
+    for recipe in Recipes.objects.raw(f'{sql} ORDER BY row_number', params):
+        previews[recipe.author_id].append(recipe)
+    return previews
+
+
+def relations_batch(request, model, field, allow_self=True):
+    serializer = RelationsBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = serializer.validated_data['ids']
+    if request.method == 'POST':
+        results = add_relations(
+            model, field, request.user, ids, allow_self=allow_self
+        )
+    else:
+        results = remove_relations(model, field, request.user, ids)
+    return Response({
+        'results': [{'id': pk, 'status': results[pk]} for pk in ids]
+    })
+
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class TagsViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tags.objects.all()
     serializer_class = TagsSerializer
     pagination_class = None
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredients.objects.all()
     serializer_class = IngredientsSerializer
     pagination_class = None
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientsFilter
 
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(self.autocomplete, request)
+
+    def autocomplete(self, request):
+        return Response(
+            ingredients_index.search(request.query_params['name'])
+        )
+
 
 class RecipesViewSet(viewsets.ModelViewSet):
-    queryset = Recipes.objects.all()
+    queryset = Recipes.objects.defer('search_vector').select_related(
+        'author'
+    ).prefetch_related(
+        'tags',
+        Prefetch(
+            'amounts',
+            queryset=IngredientsAmount.objects.select_related('ingredient')
+        )
+    )
     permission_classes = (IsStaffAuthorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipesOrderingFilter)
     filterset_class = RecipesFilter
+    ordering_fields = ('pub_date', 'favorites_count')
+    ordering = ('-pub_date', '-id')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_favorited=Exists(RecipesIsFavorited.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+                is_in_shopping_cart=Exists(
+                    RecipesIsInShoppingCart.objects.filter(
+                        user=user, recipe=OuterRef('pk')
+                    )
+                ),
+                author_is_subscribed=Exists(Subscriptions.objects.filter(
+                    user=user, following=OuterRef('author')
+                ))
+            )
+        return queryset
 
     def get_serializer(self, *args, **kwargs):
         if self.request.method == 'GET':
@@ -54,42 +162,32 @@ class RecipesViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
 
     def favorite_shopping_cart_create(self, request, pk, Model, errors):
-        if not Recipes.objects.filter(pk=pk).exists():
+        recipe = add_relation(Model, 'recipe', request.user, pk)
+        if recipe is None:
             return Response(
                 {'error': f'Нет рецепта с id {pk}'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        recipe = Recipes.objects.get(pk=pk)
-        user = request.user
-        in_list = Model.objects.filter(
-            user=user, recipe=recipe
-        ).exists()
-        if in_list:
+        if recipe.relation_id is None:
             return Response(
                 {'error': errors['post_error']},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        Model.objects.create(user=user, recipe=recipe)
         serializer = ShortRecipesSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def favorite_shopping_cart_delete(self, request, pk, Model, errors):
-        if not Recipes.objects.filter(pk=pk).exists():
+        recipe = remove_relation(Model, 'recipe', request.user, pk)
+        if recipe is None:
             return Response(
                 {'error': f'Нет рецепта с id {pk}'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        recipe = Recipes.objects.get(pk=pk)
-        user = request.user
-        in_list = Model.objects.filter(
-            user=user, recipe=recipe
-        ).exists()
-        if not in_list:
+        if recipe.relation_id is None:
             return Response(
                 {'error': errors['delete_error']},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        Model.objects.get(user=user, recipe=recipe).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(methods=['post'], detail=True,
@@ -126,32 +224,101 @@ class RecipesViewSet(viewsets.ModelViewSet):
         }
         return self.favorite_shopping_cart_delete(request, pk, Model, errors)
 
-    @action(methods=['get'], detail=False,
+    @action(methods=['post', 'delete'], detail=False,
+            url_path='favorite/batch',
             permission_classes=[IsAuthenticated])
+    def favorite_batch(self, request):
+        return relations_batch(request, RecipesIsFavorited, 'recipe')
+
+    @action(methods=['post', 'delete'], detail=False,
+            url_path='shopping_cart/batch',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_batch(self, request):
+        return relations_batch(request, RecipesIsInShoppingCart, 'recipe')
+
+    @action(methods=['get'], detail=False,
+            permission_classes=[IsAuthenticated],
+            pagination_class=TimelinePagination)
+    def feed(self, request):
+        rows = self.paginator.paginate_rows(
+            lambda limit, before: get_feed(request.user.id, limit, before),
+            request
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _, recipe_id in rows]
+        )
+        serializer = RecipeReadSerializer(
+            [recipes[recipe_id] for _, recipe_id in rows
+             if recipe_id in recipes],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(methods=['get'], detail=False)
+    def cookable(self, request):
+        ingredients = [
+            int(pk) for pk in request.query_params.getlist('ingredients')
+            if pk.isdigit()
+        ]
+        missing = dict(self.paginate_queryset(
+            cookable_index.search(ingredients)
+        ))
+        recipes = self.get_queryset().in_bulk(missing)
+        page = []
+        for recipe_id, missing_ingredients in missing.items():
+            if recipe_id in recipes:
+                recipes[recipe_id].missing_ingredients = missing_ingredients
+                page.append(recipes[recipe_id])
+        serializer = CookableRecipeSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(methods=['get'], detail=False,
+            permission_classes=[IsAuthenticated],
+            renderer_classes=(ShoppingCartTxtRenderer,
+                              ShoppingCartCsvRenderer,
+                              ShoppingCartJsonRenderer))
+    @method_decorator(condition(etag_func=shopping_cart_etag))
     def download_shopping_cart(self, request):
         user = request.user
-        recipes = Recipes.objects.filter(in_shopping_cart__user=user)
         ingredients = IngredientsAmount.objects.filter(
-            recipe__in=recipes
+            recipe__in_shopping_cart__user=user
         ).values('ingredient').annotate(total=Sum('amount')).values_list(
             'ingredient__name', 'total', 'ingredient__measurement_unit'
+        ).order_by('ingredient__name')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(cached_shopping_cart(
+                user.id,
+                get_shopping_cart_version(user.id),
+                ingredients.iterator(
+                    chunk_size=settings.SHOPPING_CART_CHUNK_SIZE
+                )
+            )),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            'attachment;'
+            f'filename="shopping_cart.{renderer.format}"'
         )
-        response = HttpResponse('Список покупок:\n', content_type='text/plain')
-        response['Content-Disposition'] = ('attachment;'
-                                           'filename="shopping_cart.txt"')
-        for ingredient in ingredients:
-            response.write(f'{ingredient[0].capitalize()}: {ingredient[1]}'
-                           f' {ingredient[2]}\n')
         return response
 
 
 class UserSubscribesViewSet(UserViewSet):
+    cursor_ordering = ('-id',)
 
     @action(methods=['get'], detail=False,
             permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
         subscribeslist = User.objects.filter(following__user=request.user)
         pages = self.paginate_queryset(subscribeslist)
+        previews = get_recipes_previews(
+            pages, request.query_params.get('recipes_limit')
+        )
+        for author in pages:
+            author.recipes_preview = previews[author.id]
         serializer = UserSubscribeSerializer(pages, many=True)
         serializer.context['request'] = request
         return self.get_paginated_response(serializer.data)
@@ -160,38 +327,43 @@ class UserSubscribesViewSet(UserViewSet):
             permission_classes=[IsAuthenticated])
     def subscribe(self, request, id=None):
         user = request.user
-        following = get_object_or_404(User, id=id)
-        is_subcribe = Subscriptions.objects.filter(
-            user=user,
-            following=following
-        ).exists()
-        if is_subcribe:
+        following = add_relation(
+            Subscriptions, 'following', user, id, allow_self=False
+        )
+        if following is None:
+            raise Http404
+        if following == user:
             return Response(
-                {'error': 'Вы уже подписаны на этого пользователя'},
+                {'error': 'Нельзя подписаться на самого себя'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        elif user == following:
+        if following.relation_id is None:
             return Response(
-                {'error': 'Нельзя подписаться на самого себя'},
+                {'error': 'Вы уже подписаны на этого пользователя'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        Subscriptions.objects.create(user=user, following=following)
         context = {'request': request}
         serializer = UserSubscribeSerializer(following, context=context)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, id=None):
-        user = request.user
-        following = get_object_or_404(User, id=id)
-        is_subcribe = Subscriptions.objects.filter(
-            user=user,
-            following=following
-        ).exists()
-        if not is_subcribe:
+        following = remove_relation(
+            Subscriptions, 'following', request.user, id
+        )
+        if following is None:
+            raise Http404
+        if following.relation_id is None:
             return Response(
                 {'error': 'Вы не подписаны на этого пользователя'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        Subscriptions.objects.get(user=user, following=following).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(methods=['post', 'delete'], detail=False,
+            url_path='subscribe/batch',
+            permission_classes=[IsAuthenticated])
+    def subscribe_batch(self, request):
+        return relations_batch(
+            request, Subscriptions, 'following', allow_self=False
+        )
@@ -18,7 +18,7 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
 
-ALLOWED_HOSTS = ['o-foodgram.sytes.net', '158.160.18.17', '127.0.0.1', 'localhost']
+ALLOWED_HOSTS = ['o-foodgram.sytes.net', '158.160.18.17', '127.0.0.1', 'localhost', 'backend']
 
 AUTH_USER_MODEL = 'users.User'
 
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'rest_framework.authtoken',
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -96,6 +99,15 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -121,7 +133,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPagination',
@@ -165,6 +177,97 @@ LIMIT_SLUG = 16
 
 LIMIT_SELF_TEXT = 30
 
+SHOPPING_CART_CHUNK_SIZE = 2000
+
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+CATALOG_VERSION_TIMEOUT = 10
+
+INGREDIENTS_AUTOCOMPLETE_LIMIT = 20
+
+COOKABLE_CHANGES_KEEP = 10000
+
+COOKABLE_CHANGES_LOOKBACK = 100
+
+SEARCH_CONFIG = 'russian'
+
+POPULAR_HALF_LIFE = 60 * 60 * 24 * 3
+
+POPULAR_EPOCH = 1704067200
+
+POPULAR_WEIGHTS = {
+    'recipes.recipesisfavorited': 1.0,
+    'recipes.recipesisinshoppingcart': 2.0,
+}
+
+POPULAR_REFRESH_INTERVAL = 60 * 5
+
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+
+FEED_BACKFILL_SIZE = 50
+
+INSTRUMENTATION = os.getenv('INSTRUMENTATION', 'False') == 'True'
+
+METRICS = os.getenv('METRICS', 'True') == 'True'
+
+INSTRUMENTATION_QUERY_BUDGET = 15
+
+INSTRUMENTATION_QUERY_BUDGETS = {
+    'GET recipes-list': 5,
+    'GET recipes-detail': 5,
+    'GET recipes-feed': 5,
+    'GET users-subscriptions': 5,
+    'POST recipes-list': 20,
+    'PATCH recipes-detail': 20,
+}
+
+INSTRUMENTATION_SLOWEST_QUERIES = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+RELATIONS_BATCH_MAX_SIZE = 100
+
+TOKEN_CACHE_SIZE = 1024
+
+TOKEN_CACHE_TIMEOUT = 60
+
+TOKEN_CACHE_LOCAL_TIMEOUT = 5
+
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+
+RECIPE_IMAGE_DECODE_CHUNK_SIZE = 64 * 1024
+
+RECIPE_IMAGE_WORKERS = 2
+
+RECIPE_IMAGE_FORMAT = 'WEBP'
+
+RECIPE_IMAGE_QUALITY = 80
+
+RECIPE_IMAGE_RENDITIONS = {
+    'thumbnail': (240, 240),
+    'card': (800, 800),
+    'full': (1600, 1600),
+}
+
 FORBIDDEN_USERNAMES = [
     'me',
 ]
@@ -0,0 +1,27 @@
+import os
+import shutil
+from importlib import import_module
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+
+
+def on_starting(server):
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    import_module('api.metrics').get_worker_exits()
+
+
+def post_fork(server, worker):
+    from api.metrics import get_workers
+
+    get_workers().set(1)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    from api.metrics import get_worker_exits
+
+    multiprocess.mark_process_dead(worker.pid)
+    get_worker_exits().inc()
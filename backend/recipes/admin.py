@@ -16,7 +16,7 @@ class RecipesAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
     def count_recipes(self, object):
-        return object.in_favorited.count()
+        return object.favorites_count
 
     count_recipes.short_description = 'Количество добавлений в избранное'
 
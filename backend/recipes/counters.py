@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import (Recipes, RecipesIsFavorited,
+                            RecipesIsInShoppingCart, Subscriptions)
+
+User = get_user_model()
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def recount():
+    recipes = Recipes.objects.update(
+        favorites_count=count_subquery(RecipesIsFavorited, 'recipe'),
+        shopping_cart_count=count_subquery(RecipesIsInShoppingCart, 'recipe')
+    )
+    users = User.objects.update(
+        recipes_count=count_subquery(Recipes, 'author'),
+        followers_count=count_subquery(Subscriptions, 'following')
+    )
+    return recipes, users
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+
+from recipes.models import Recipes, Subscriptions, Timelines
+
+User = get_user_model()
+
+
+def get_tables(connection):
+    quote = connection.ops.quote_name
+    return {
+        'timelines': quote(Timelines._meta.db_table),
+        'recipes': quote(Recipes._meta.db_table),
+        'subscriptions': quote(Subscriptions._meta.db_table),
+        'users': quote(User._meta.db_table),
+    }
+
+
+def execute(sql, params, using=None, **conditions):
+    connection = connections[using or router.db_for_write(Timelines)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.format(**get_tables(connection), **conditions), params
+        )
+        if cursor.description is None:
+            return cursor.rowcount
+        return cursor.fetchall()
+
+
+def fan_out(recipe):
+    return execute(
+        'INSERT INTO {timelines} (user_id, recipe_id, pub_date) '
+        'SELECT subscriptions.user_id, %(recipe)s, %(pub_date)s '
+        'FROM {subscriptions} AS subscriptions '
+        'JOIN {users} AS users ON users.id = subscriptions.following_id '
+        'WHERE subscriptions.following_id = %(author)s '
+        'AND users.followers_count <= %(max_followers)s '
+        'ON CONFLICT DO NOTHING',
+        {
+            'recipe': recipe.id,
+            'pub_date': recipe.pub_date,
+            'author': recipe.author_id,
+            'max_followers': settings.FEED_FANOUT_MAX_FOLLOWERS,
+        }
+    )
+
+
+def backfill(user_id, author_ids):
+    return execute(
+        'INSERT INTO {timelines} (user_id, recipe_id, pub_date) '
+        'SELECT %(user)s, recipes.id, recipes.pub_date '
+        'FROM {users} AS users CROSS JOIN LATERAL ('
+        'SELECT id, pub_date FROM {recipes} WHERE author_id = users.id '
+        'ORDER BY pub_date DESC, id DESC LIMIT %(size)s) AS recipes '
+        'WHERE users.id = ANY(%(authors)s) '
+        'AND users.followers_count <= %(max_followers)s '
+        'ON CONFLICT DO NOTHING',
+        {
+            'user': user_id,
+            'authors': list(author_ids),
+            'size': settings.FEED_BACKFILL_SIZE,
+            'max_followers': settings.FEED_FANOUT_MAX_FOLLOWERS,
+        }
+    )
+
+
+def remove(user_id, author_ids):
+    return execute(
+        'DELETE FROM {timelines} AS timelines USING {recipes} AS recipes '
+        'WHERE timelines.user_id = %(user)s '
+        'AND timelines.recipe_id = recipes.id '
+        'AND recipes.author_id = ANY(%(authors)s)',
+        {'user': user_id, 'authors': list(author_ids)}
+    )
+
+
+def get_feed(user_id, limit, before=None):
+    timeline_condition = recipes_condition = ''
+    if before is not None:
+        timeline_condition = (
+            'AND (pub_date, recipe_id) < (%(pub_date)s, %(recipe)s)'
+        )
+        recipes_condition = (
+            'AND (recipes.pub_date, recipes.id) < (%(pub_date)s, %(recipe)s)'
+        )
+    return execute(
+        '(SELECT pub_date, recipe_id FROM {timelines} '
+        'WHERE user_id = %(user)s {timeline_condition} '
+        'ORDER BY pub_date DESC, recipe_id DESC LIMIT %(limit)s) '
+        'UNION '
+        '(SELECT recipes.pub_date, recipes.id '
+        'FROM {subscriptions} AS subscriptions '
+        'JOIN {users} AS users ON users.id = subscriptions.following_id '
+        'JOIN {recipes} AS recipes ON recipes.author_id = users.id '
+        'WHERE subscriptions.user_id = %(user)s '
+        'AND users.followers_count > %(max_followers)s {recipes_condition} '
+        'ORDER BY recipes.pub_date DESC, recipes.id DESC LIMIT %(limit)s) '
+        'ORDER BY 1 DESC, 2 DESC LIMIT %(limit)s',
+        {
+            'user': user_id,
+            'limit': limit,
+            'max_followers': settings.FEED_FANOUT_MAX_FOLLOWERS,
+            'pub_date': before and before[0],
+            'recipe': before and before[1],
+        },
+        using=router.db_for_read(Timelines),
+        timeline_condition=timeline_condition,
+        recipes_condition=recipes_condition
+    )
@@ -0,0 +1,61 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix='recipe-images'
+)
+
+RENDITION_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+def rendition_name(name, rendition):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    extension = RENDITION_EXTENSIONS[settings.RECIPE_IMAGE_FORMAT]
+    return f'recipes/renditions/{stem}_{rendition}.{extension}'
+
+
+def make_renditions(recipe_id, name):
+    from recipes.models import Recipes
+
+    try:
+        storage = Recipes._meta.get_field('image').storage
+        with storage.open(name) as file, Image.open(file) as original:
+            original = ImageOps.exif_transpose(original).convert('RGB')
+            renditions = {'source': name}
+            for rendition, size in settings.RECIPE_IMAGE_RENDITIONS.items():
+                image = original.copy()
+                image.thumbnail(size)
+                buffer = BytesIO()
+                image.save(
+                    buffer,
+                    format=settings.RECIPE_IMAGE_FORMAT,
+                    quality=settings.RECIPE_IMAGE_QUALITY
+                )
+                renditions[rendition] = storage.save(
+                    rendition_name(name, rendition),
+                    ContentFile(buffer.getvalue())
+                )
+        Recipes.objects.filter(pk=recipe_id, image=name).update(
+            renditions=renditions
+        )
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(recipe):
+    recipe_id, name = recipe.id, recipe.image.name
+    transaction.on_commit(
+        lambda: executor.submit(make_renditions, recipe_id, name)
+    )
@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from recipes.models import Ingredients
+
+HEADER = ('name', 'measurement_unit')
+STAGING_TABLE = 'ingredients_staging'
+
+
+def iter_json_array(file, chunk_size):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    for chunk in iter(lambda: file.read(chunk_size), ''):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError('Ожидается JSON-массив')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield item
+    if buffer[position:].strip():
+        raise ValueError('Файл JSON оборвался')
+
+
+def iter_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if tuple(row) != HEADER:
+            yield dict(zip(HEADER, row))
+
+
+def read_ingredients(path, chunk_size=64 * 1024):
+    with open(path, encoding='utf-8', newline='') as file:
+        if Path(path).suffix.lower() == '.csv':
+            items = iter_csv(file)
+        else:
+            items = iter_json_array(file, chunk_size)
+        for item in items:
+            name = (item.get('name') or '').strip()
+            measurement_unit = (item.get('measurement_unit') or '').strip()
+            if (
+                name and measurement_unit
+                and len(name) <= settings.LIMIT_NAME
+                and len(measurement_unit) <= settings.LIMIT_SLUG
+            ):
+                yield name, measurement_unit
+
+
+def copy_batch(cursor, table, batch):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY {STAGING_TABLE} (name, measurement_unit) '
+        'FROM STDIN WITH (FORMAT csv)',
+        buffer
+    )
+    cursor.execute(
+        f'INSERT INTO {table} (name, measurement_unit) '
+        f'SELECT name, measurement_unit FROM {STAGING_TABLE} '
+        'ORDER BY name, measurement_unit ON CONFLICT DO NOTHING'
+    )
+    inserted = cursor.rowcount
+    cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+    return inserted
+
+
+def load_ingredients(rows, batch_size):
+    connection = connections[router.db_for_write(Ingredients)]
+    table = connection.ops.quote_name(Ingredients._meta.db_table)
+    read = inserted = 0
+    batch = set()
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE {STAGING_TABLE} '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            for row in rows:
+                read += 1
+                batch.add(row)
+                if len(batch) >= batch_size:
+                    inserted += copy_batch(cursor, table, batch)
+                    batch = set()
+            if batch:
+                inserted += copy_batch(cursor, table, batch)
+    return read, inserted
@@ -0,0 +1,34 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache import invalidate_catalog
+from recipes.loaders import load_ingredients, read_ingredients
+from recipes.models import Ingredients
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из JSON или CSV через COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=settings.CSV_FILES_DIR / 'ingredients.json'
+        )
+        parser.add_argument('--batch-size', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        try:
+            read, inserted = load_ingredients(
+                read_ingredients(options['path']), options['batch_size']
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        elapsed = perf_counter() - start
+        invalidate_catalog(Ingredients)
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {read}, добавлено ингредиентов: {inserted} '
+            f'за {elapsed:.1f} с ({read / elapsed:.0f} строк/с)'
+        ))
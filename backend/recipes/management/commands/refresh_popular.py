@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.popular import refresh_popular
+
+
+class Command(BaseCommand):
+    help = 'Обновляет рейтинг популярных рецептов по новым добавлениям'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Обновлять рейтинг каждые POPULAR_REFRESH_INTERVAL секунд'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            recipes = refresh_popular()
+            self.stdout.write(self.style.SUCCESS(
+                f'Обновлено рецептов: {recipes}'
+            ))
+            if not options['loop']:
+                return
+            time.sleep(settings.POPULAR_REFRESH_INTERVAL)
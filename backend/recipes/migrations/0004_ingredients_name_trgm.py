@@ -0,0 +1,20 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:30
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_alter_subscriptions_following'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='ingredients',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='ingredients_name_trgm', opclasses=('gin_trgm_ops',)),
+        ),
+    ]
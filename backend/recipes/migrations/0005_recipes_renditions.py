@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredients_name_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные копии изображения'),
+        ),
+    ]
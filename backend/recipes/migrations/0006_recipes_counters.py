@@ -0,0 +1,57 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipes = apps.get_model('recipes', 'Recipes')
+    RecipesIsFavorited = apps.get_model('recipes', 'RecipesIsFavorited')
+    RecipesIsInShoppingCart = apps.get_model(
+        'recipes', 'RecipesIsInShoppingCart'
+    )
+    Subscriptions = apps.get_model('recipes', 'Subscriptions')
+    User = apps.get_model('users', 'User')
+    Recipes.objects.update(
+        favorites_count=count_subquery(RecipesIsFavorited, 'recipe'),
+        shopping_cart_count=count_subquery(RecipesIsInShoppingCart, 'recipe')
+    )
+    User.objects.update(
+        recipes_count=count_subquery(Recipes, 'author'),
+        followers_count=count_subquery(Subscriptions, 'following')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipes_renditions'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в список покупок'),
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipes_favorites_count_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipes_counters'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                f'DELETE FROM {table} AS duplicate USING {table} AS original '
+                'WHERE duplicate.user_id = original.user_id '
+                'AND duplicate.recipe_id = original.recipe_id '
+                'AND duplicate.id > original.id;'
+                for table in (
+                    'recipes_recipesisfavorited',
+                    'recipes_recipesisinshoppingcart'
+                )
+            ] + [
+                'UPDATE recipes_recipes SET '
+                'favorites_count = (SELECT COUNT(*) '
+                'FROM recipes_recipesisfavorited '
+                'WHERE recipe_id = recipes_recipes.id), '
+                'shopping_cart_count = (SELECT COUNT(*) '
+                'FROM recipes_recipesisinshoppingcart '
+                'WHERE recipe_id = recipes_recipes.id);'
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX recipes_recipes_tags_tags_id_recipes_id_idx '
+                'ON recipes_recipes_tags (tags_id, recipes_id);',
+            reverse_sql='DROP INDEX recipes_recipes_tags_tags_id_recipes_id_idx;',
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['author', '-pub_date'], name='recipes_author_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipesisfavorited',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_recipesisfavorited_user_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipesisinshoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_recipesisinshoppingcart_user_recipe'),
+        ),
+    ]
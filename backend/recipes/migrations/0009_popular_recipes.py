@@ -0,0 +1,40 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipes_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularRecipes',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='recipes.recipes', verbose_name='Рецепт')),
+                ('score', models.FloatField(verbose_name='Популярность')),
+            ],
+            options={
+                'verbose_name': 'Популярный рецепт',
+                'verbose_name_plural': 'Популярные рецепты',
+            },
+        ),
+        migrations.CreateModel(
+            name='Watermarks',
+            fields=[
+                ('name', models.CharField(max_length=200, primary_key=True, serialize=False, verbose_name='Название')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Отметка обновления',
+                'verbose_name_plural': 'Отметки обновления',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='popularrecipes',
+            index=models.Index(fields=['-score', '-recipe'], name='popular_recipes_score_idx'),
+        ),
+    ]
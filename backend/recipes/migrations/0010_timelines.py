@@ -0,0 +1,52 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timelines(apps, schema_editor):
+    schema_editor.execute(
+        'INSERT INTO recipes_timelines (user_id, recipe_id, pub_date) '
+        'SELECT subscriptions.user_id, recipes.id, recipes.pub_date '
+        'FROM recipes_subscriptions AS subscriptions '
+        'JOIN users_user AS users ON users.id = subscriptions.following_id '
+        'CROSS JOIN LATERAL (SELECT id, pub_date FROM recipes_recipes '
+        'WHERE author_id = users.id ORDER BY pub_date DESC, id DESC '
+        'LIMIT %s) AS recipes '
+        'WHERE users.followers_count <= %s ON CONFLICT DO NOTHING',
+        (settings.FEED_BACKFILL_SIZE, settings.FEED_FANOUT_MAX_FOLLOWERS)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0009_popular_recipes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Timelines',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timelines', to='recipes.recipes', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Лента подписок',
+                'verbose_name_plural': 'Ленты подписок',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelines',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='timelines_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelines',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_timeline_user_recipe'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
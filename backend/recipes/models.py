@@ -1,6 +1,8 @@
 from colorfield.fields import ColorField
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -51,6 +53,13 @@ class Ingredients(BaseTagsIngredientsRecipesModel):
                 name='unique_name_measurement_unit'
             )
         ]
+        indexes = [
+            GinIndex(
+                fields=('name',),
+                name='ingredients_name_trgm',
+                opclasses=('gin_trgm_ops',)
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -66,6 +75,12 @@ class Recipes(BaseTagsIngredientsRecipesModel):
         'Изображение блюда',
         upload_to='recipes/images/',
     )
+    renditions = models.JSONField(
+        'Уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     text = models.TextField('Описание приготовления блюда')
     ingredients = models.ManyToManyField(
         Ingredients,
@@ -88,6 +103,21 @@ class Recipes(BaseTagsIngredientsRecipesModel):
         auto_now_add=True,
         db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'Количество добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        'Количество добавлений в список покупок',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -100,6 +130,20 @@ class Recipes(BaseTagsIngredientsRecipesModel):
                 name='unique_name_author'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipes_favorites_count_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipes_author_pub_date_idx'
+            ),
+            GinIndex(
+                fields=('search_vector',),
+                name='recipes_search_vector_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name[:settings.LIMIT_SELF_TEXT]
@@ -139,14 +183,14 @@ class BaseFavoritedShoppingCartModel(models.Model):
         constraints = [
             models.UniqueConstraint(
                 fields=('user', 'recipe'),
-                name='unique_user_recipe'
+                name='unique_%(class)s_user_recipe'
             )
         ]
 
 
 class RecipesIsFavorited(BaseFavoritedShoppingCartModel):
 
-    class Meta:
+    class Meta(BaseFavoritedShoppingCartModel.Meta):
         verbose_name = 'Избранное'
         verbose_name_plural = 'Рецепты в избранном'
         default_related_name = 'in_favorited'
@@ -154,7 +198,7 @@ class RecipesIsFavorited(BaseFavoritedShoppingCartModel):
 
 class RecipesIsInShoppingCart(BaseFavoritedShoppingCartModel):
 
-    class Meta:
+    class Meta(BaseFavoritedShoppingCartModel.Meta):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Рецепты в списках покупок'
         default_related_name = 'in_shopping_cart'
@@ -185,3 +229,84 @@ class Subscriptions(models.Model):
                 name='prevent_self_follow'
             )
         ]
+
+
+class Timelines(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipes,
+        on_delete=models.CASCADE,
+        related_name='timelines',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Лента подписок'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_timeline_user_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='timelines_user_pub_date_idx'
+            )
+        ]
+
+
+class PopularRecipes(models.Model):
+    recipe = models.OneToOneField(
+        Recipes,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField('Популярность')
+
+    class Meta:
+        verbose_name = 'Популярный рецепт'
+        verbose_name_plural = 'Популярные рецепты'
+        indexes = [
+            models.Index(
+                fields=('-score', '-recipe'),
+                name='popular_recipes_score_idx'
+            )
+        ]
+
+
+class Watermarks(models.Model):
+    name = models.CharField(
+        'Название',
+        max_length=settings.LIMIT_NAME,
+        primary_key=True
+    )
+    value = models.BigIntegerField('Значение', default=0)
+
+    class Meta:
+        verbose_name = 'Отметка обновления'
+        verbose_name_plural = 'Отметки обновления'
+
+
+class IngredientsChanges(models.Model):
+    recipe = models.ForeignKey(
+        Recipes,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение ингредиентов рецепта'
+        verbose_name_plural = 'Изменения ингредиентов рецептов'
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+from recipes.models import (PopularRecipes, RecipesIsFavorited,
+                            RecipesIsInShoppingCart, Watermarks)
+
+SOURCES = (RecipesIsFavorited, RecipesIsInShoppingCart)
+
+
+def get_settled_id(connection, model):
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'LOCK TABLE '
+                f'{connection.ops.quote_name(model._meta.db_table)} '
+                'IN SHARE MODE'
+            )
+        return model.objects.using(connection.alias).aggregate(
+            last_id=Max('id')
+        )['last_id']
+
+
+def refresh_source(cursor, model, now, last_id):
+    watermark, _ = Watermarks.objects.select_for_update().get_or_create(
+        name=f'popular:{model._meta.label_lower}'
+    )
+    if last_id is None or last_id <= watermark.value:
+        return 0
+    quote = cursor.db.ops.quote_name
+    table = quote(PopularRecipes._meta.db_table)
+    cursor.execute(
+        f'INSERT INTO {table} (recipe_id, score) '
+        'SELECT recipe_id, LN(COUNT(*) * %(weight)s) / LN(2) + %(time)s '
+        f'FROM {quote(model._meta.db_table)} '
+        'WHERE id > %(first)s AND id <= %(last)s GROUP BY recipe_id '
+        'ON CONFLICT (recipe_id) DO UPDATE SET score = '
+        f'GREATEST(EXCLUDED.score, {table}.score) + LN(1 + POWER(2, GREATEST('
+        f'-ABS(EXCLUDED.score - {table}.score), -64))) / LN(2)',
+        {
+            'weight': settings.POPULAR_WEIGHTS[model._meta.label_lower],
+            'time': (
+                (now - settings.POPULAR_EPOCH) / settings.POPULAR_HALF_LIFE
+            ),
+            'first': watermark.value,
+            'last': last_id,
+        }
+    )
+    recipes = cursor.rowcount
+    watermark.value = last_id
+    watermark.save(update_fields=('value',))
+    return recipes
+
+
+def refresh_popular(now=None):
+    now = time.time() if now is None else now
+    connection = connections[router.db_for_write(PopularRecipes)]
+    last_ids = [get_settled_id(connection, model) for model in SOURCES]
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            return sum(
+                refresh_source(cursor, model, now, last_id)
+                for model, last_id in zip(SOURCES, last_ids)
+            )
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db.models import OuterRef, Subquery
+
+from recipes.models import IngredientsAmount
+
+
+def search_vector():
+    ingredients = Subquery(
+        IngredientsAmount.objects.filter(recipe=OuterRef('pk')).order_by(
+        ).values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=settings.SEARCH_CONFIG)
+        + SearchVector(ingredients, weight='B', config=settings.SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=settings.SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(recipes):
+    return recipes.update(search_vector=search_vector())